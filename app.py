@@ -1,5 +1,7 @@
 from flask import Flask, session, request
 from flask_login import LoginManager
+from jinja2 import FileSystemBytecodeCache
+from sqlalchemy.engine import make_url
 from src.config import Config
 from src.models.user import User
 from src.models.provider import db, Provider
@@ -18,6 +20,7 @@ import stripe
 import json
 import os
 from src.decorators.trial_required import trial_required
+from src.services.trial_service import trial_service
 
 # Configure logging
 Config.setup_logging()
@@ -44,6 +47,9 @@ else:
 # Configure Flask app
 app = Flask(__name__)
 
+# Cache compiled templates on disk so each worker doesn't recompile them after a restart
+app.jinja_env.bytecode_cache = FileSystemBytecodeCache(Config.TEMPLATE_CACHE_DIR)
+
 # Apply configuration
 app.config['SECRET_KEY'] = Config.SECRET_KEY
 app.config['PERMANENT_SESSION_LIFETIME'] = Config.PERMANENT_SESSION_LIFETIME
@@ -67,20 +73,39 @@ app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
 # PostgreSQL connection settings
 app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+    # One connection per gunicorn thread (see DockerFile), with a little headroom for bursts
+    'pool_size': int(os.getenv('DB_POOL_SIZE', '4')),
+    'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', '2')),
     'pool_timeout': 10,
     'pool_recycle': 300,
+    'pool_pre_ping': True,  # Drop connections the Supabase pooler has closed before handing them out
     'connect_args': {
         'connect_timeout': 10
     }
 }
 
-logger.info(f"Using database: {Config.DATABASE_URL_FINAL}")
+logger.info("Using database: %s", make_url(Config.DATABASE_URL_FINAL).render_as_string(hide_password=True))
 db.init_app(app)
 
-# Create tables
-with app.app_context():
-    db.create_all()
-    logger.info("PostgreSQL database tables created")
+def init_database():
+    """Create missing tables and indexes. Run once before serving, not in every worker."""
+    with app.app_context():
+        db.create_all()
+        logger.info("PostgreSQL database tables created")
+        # create_all() skips tables that already exist, so create any model index
+        # they are still missing; checkfirst makes this safe on every startup
+        try:
+            for table in db.metadata.sorted_tables:
+                for index in table.indexes:
+                    index.create(db.engine, checkfirst=True)
+            logger.info("PostgreSQL database indexes ensured")
+        except Exception as e:
+            logger.error(f"Error creating database indexes: {e}")
+
+@app.cli.command("init-db")
+def init_db_command():
+    """Create missing database tables and indexes."""
+    init_database()
 
 # Initialize Flask-Login
 login_manager = LoginManager()
@@ -88,6 +113,17 @@ login_manager.init_app(app)
 login_manager.login_view = "auth.login"
 # No login message - users will be redirected to login page
 
+def invalidate_subscription_for_customer(customer_id):
+    """Drop the cached subscription status of the user behind a Stripe customer."""
+    if not customer_id:
+        return
+    try:
+        customer = stripe.Customer.retrieve(customer_id)
+        if customer.email:
+            trial_service.invalidate_subscription_cache(customer.email)
+    except Exception as e:
+        logger.error(f"Error invalidating subscription cache for customer {customer_id}: {e}")
+
 # Stripe Webhook Route - Direct on main app for reliability
 @app.route("/webhook", methods=["POST"])
 def stripe_webhook():
@@ -117,6 +153,8 @@ def stripe_webhook():
             customer_email = session_obj.get('customer_email')
             subscription_id = session_obj.get('subscription')
             logger.info(f"Payment completed for {customer_email}, subscription: {subscription_id}")
+            if customer_email:
+                trial_service.invalidate_subscription_cache(customer_email)
             
         elif event['type'] == 'customer.subscription.created':
             subscription = event['data']['object']
@@ -129,6 +167,7 @@ def stripe_webhook():
             subscription_id = subscription.get('id')
             status = subscription.get('status')
             logger.info(f"Subscription updated: {subscription_id} status: {status}")
+            invalidate_subscription_for_customer(subscription.get('customer'))
             
             # Check if this is a trial subscription that just got a payment method
             if status == 'active' and subscription.get('trial_end'):
@@ -139,6 +178,7 @@ def stripe_webhook():
             subscription = event['data']['object']
             subscription_id = subscription.get('id')
             logger.warning(f"Subscription cancelled: {subscription_id}")
+            invalidate_subscription_for_customer(subscription.get('customer'))
             
         elif event['type'] == 'invoice.payment_failed':
             invoice = event['data']['object']
@@ -146,6 +186,7 @@ def stripe_webhook():
             subscription_id = invoice.get('subscription')
             attempt_count = invoice.get('attempt_count', 0)
             logger.warning(f"Payment failed for customer: {customer_id}, subscription: {subscription_id}, attempt: {attempt_count}")
+            invalidate_subscription_for_customer(customer_id)
             
         elif event['type'] == 'invoice.payment_succeeded':
             invoice = event['data']['object']
@@ -182,7 +223,7 @@ def stripe_webhook():
                 logger.error(f"Error processing invoice.will_be_due for customer {customer_id}: {e}")
             
         else:
-            logger.debug(f"Unhandled webhook type: {event['type']}")
+            logger.debug("Unhandled webhook type: %s", event['type'])
         
         return 'success', 200
         
@@ -209,7 +250,7 @@ def load_user(user_id):
         if user:
             return user
         else:
-            logger.debug(f"User {user_id} not found in database")
+            logger.debug("User %s not found in database", user_id)
     except Exception as e:
         logger.warning(f"Could not load user {user_id}. Error: {e}")
     
@@ -251,13 +292,15 @@ def add_cors_headers(response):
 @app.before_request
 def log_request_info():
     """Log request information."""
-    logger.info(f"Request: {request.method} {request.url}")
+    logger.info("Request: %s %s", request.method, request.url)
 
 @app.after_request
 def log_response_info(response):
     """Log response information."""
-    logger.info(f"Response: {response.status_code}")
+    logger.info("Response: %s", response.status_code)
     return response
 
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=7860, debug=True) 
\ No newline at end of file
+    # Development server only; production runs under gunicorn (see DockerFile)
+    init_database()
+    app.run(host="0.0.0.0", port=7860, debug=os.getenv("FLASK_DEBUG", "0") == "1") 
\ No newline at end of file
@@ -1,7 +1,6 @@
 import os
 from datetime import timedelta
 from dotenv import load_dotenv
-from cryptography.fernet import Fernet
 import logging
 
 # Load environment variables from .env file
@@ -24,9 +23,6 @@ class Config:
     SESSION_FILE_MODE = 0o600
     SESSION_USE_SIGNER = True
     
-    # Encryption
-    ENCRYPTION_KEY = os.environ.get("FLASK_APP_ENCRYPTION_KEY")
-    
     # Stripe Configuration
     STRIPE_SECRET_KEY = os.environ.get("STRIPE_SECRET_KEY")
     STRIPE_PUBLISHABLE_KEY = os.environ.get("STRIPE_PUBLISHABLE_KEY") 
@@ -39,12 +35,13 @@ class Config:
     
     # PostgreSQL Configuration
     DATABASE_URL = os.environ.get("DATABASE_URL") or os.environ.get("POSTGRES_URL")
+    USING_SUPABASE_POOLER = False  # Reported by setup_logging once logging is configured
 
     # Fix for Supabase: Use connection pooling port and add timeout settings
     if DATABASE_URL and "supabase.co:5432" in DATABASE_URL:
         # Replace direct port 5432 with pooling port 6543
         DATABASE_URL = DATABASE_URL.replace(":5432/", ":6543/")
-        print(f"Updated DATABASE_URL to use pooling port: {DATABASE_URL}")
+        USING_SUPABASE_POOLER = True
 
     if not DATABASE_URL:
         # Fallback to individual components
@@ -63,6 +60,7 @@ class Config:
     USERS_DIR = os.path.join(DATA_DIR, 'users')
     SESSIONS_DIR = os.path.join(DATA_DIR, 'flask_sessions')
     DIFF_STORE_DIR = os.path.join(DATA_DIR, 'diff_store')
+    TEMPLATE_CACHE_DIR = os.path.join(DATA_DIR, 'template_cache')
     
     @classmethod
     def validate_env_vars(cls):
@@ -78,35 +76,38 @@ class Config:
             logging.warning(f"Missing environment variables: {missing_vars}")
             logging.warning("Some Stripe features may not work properly.")
         
+        # Check session key - every worker must sign sessions with the same persistent key
+        if cls.SECRET_KEY == 'dev':
+            logging.warning("SECRET_KEY / FLASK_SESSION_SECRET_KEY not set - using the insecure 'dev' session key.")
+        
         logging.info("Environment validation completed.")
     
     @classmethod
     def setup_directories(cls):
         """Create necessary directories if they don't exist."""
         # Create necessary directories
-        directories = [cls.DATA_DIR, cls.USERS_DIR, cls.SESSIONS_DIR, cls.DIFF_STORE_DIR]
+        directories = [cls.DATA_DIR, cls.USERS_DIR, cls.SESSIONS_DIR, cls.DIFF_STORE_DIR, cls.TEMPLATE_CACHE_DIR]
         for directory in directories:
             os.makedirs(directory, exist_ok=True)
         
-        # Verify session directory is writable
-        test_file = os.path.join(cls.SESSIONS_DIR, "test_write.tmp")
+        # Verify session directory is writable; per-process name so concurrent workers don't collide
+        test_file = os.path.join(cls.SESSIONS_DIR, f"test_write_{os.getpid()}.tmp")
         with open(test_file, "w") as f:
             f.write("test")
         os.remove(test_file)
         
         logging.info(f"Session directory verified at: {cls.SESSIONS_DIR}")
     
-    @classmethod
-    def get_cipher_suite(cls):
-        """Get the encryption cipher suite."""
-        if not cls.ENCRYPTION_KEY:
-            raise ValueError("CRITICAL: FLASK_APP_ENCRYPTION_KEY environment variable not set!")
-        return Fernet(cls.ENCRYPTION_KEY.encode())
-    
     @classmethod
     def setup_logging(cls):
         """Configure logging."""
+        level_name = os.environ.get('LOG_LEVEL', 'INFO').upper()
+        level_is_valid = level_name in logging.getLevelNamesMapping()
         logging.basicConfig(
-            level=logging.DEBUG,
+            level=level_name if level_is_valid else logging.INFO,
             format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-        ) 
\ No newline at end of file
+        )
+        if not level_is_valid:
+            logging.warning(f"Unknown LOG_LEVEL {level_name!r}; using INFO")
+        if cls.USING_SUPABASE_POOLER:
+            logging.info("Updated DATABASE_URL to use Supabase connection pooling port 6543") 
\ No newline at end of file
@@ -4,7 +4,7 @@ Ensures users have completed Stripe checkout before accessing app features.
 """
 
 from functools import wraps
-from flask import redirect, url_for, flash, session, request
+from flask import redirect, url_for, flash, session, request, g
 from flask_login import current_user
 import logging
 
@@ -27,8 +27,8 @@ def trial_required(f):
         try:
             from src.services.trial_service import trial_service
             
-            # Check trial/subscription status
-            trial_status = trial_service.get_trial_status(current_user)
+            # Check trial/subscription status; Stripe is only consulted once the trial is over
+            trial_status = trial_service.get_trial_status(current_user, check_subscription_in_trial=False)
             
             if not trial_status['has_access']:
                 # Trial expired and no subscription
@@ -36,6 +36,9 @@ def trial_required(f):
                 flash("Your free trial has expired. Please subscribe to continue using Waitlyst.", "error")
                 return redirect(url_for('payments.subscribe'))
             
+            # Keep the status for the view so it doesn't look it up again this request
+            g.trial_status = trial_status
+            
             # User has valid access - proceed with the function
             return f(*args, **kwargs)
             
@@ -1,5 +1,6 @@
 import json
 from src.models.provider import db
+from src.utils.helpers import format_wait_days, wait_days_since
 from datetime import datetime
 import uuid
 
@@ -7,6 +8,10 @@ class Patient(db.Model):
     """SQLAlchemy model for patients table."""
     
     __tablename__ = 'patients'
+    __table_args__ = (
+        # Waitlist views filter a practice's patients by status
+        db.Index('ix_patients_user_id_status', 'user_id', 'status'),
+    )
     
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     user_id = db.Column(db.String(36), nullable=False)
@@ -26,6 +31,7 @@ class Patient(db.Model):
     
     def to_dict(self):
         """Convert model to dictionary."""
+        wait_days = wait_days_since(self.created_at)
         return {
             'id': self.id,
             'user_id': self.user_id,
@@ -41,7 +47,9 @@ class Patient(db.Model):
             'availability_mode': self.availability_mode,
             'reason': self.reason,
             'proposed_slot_id': self.proposed_slot_id,
-            'created_at': self.created_at.isoformat() if self.created_at else None
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'wait_days': wait_days,
+            'wait_time': format_wait_days(wait_days)
         }
     
     @classmethod
@@ -8,6 +8,9 @@ class Provider(db.Model):
     """SQLAlchemy model for providers table."""
     
     __tablename__ = 'providers'
+    __table_args__ = (
+        db.Index('ix_providers_user_id', 'user_id'),
+    )
     
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     user_id = db.Column(db.String(36), nullable=False)
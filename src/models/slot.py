@@ -6,6 +6,10 @@ class Slot(db.Model):
     """SQLAlchemy model for cancelled_slots table."""
     
     __tablename__ = 'cancelled_slots'
+    __table_args__ = (
+        # Open slots are listed per practice and status, earliest first
+        db.Index('ix_cancelled_slots_user_id_status_date', 'user_id', 'status', 'date', 'start_time'),
+    )
     
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     user_id = db.Column(db.String(36), nullable=False)
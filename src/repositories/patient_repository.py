@@ -1,4 +1,4 @@
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from src.models.patient import Patient, db
 import logging
 
@@ -16,6 +16,14 @@ class PatientRepository:
             logger.error(f"Error getting patients for user {user_id}: {e}")
             return []
     
+    def get_name_phone_pairs(self, user_id: str) -> List[Tuple[str, str]]:
+        """Get (name, phone) for every patient of a user, without loading full rows."""
+        try:
+            return db.session.query(Patient.name, Patient.phone).filter_by(user_id=user_id).all()
+        except Exception as e:
+            logger.error(f"Error getting patient names for user {user_id}: {e}")
+            return []
+    
     def get_by_status(self, user_id: str, status: str) -> List[Dict[str, Any]]:
         """Get patients by status."""
         try:
@@ -25,31 +33,17 @@ class PatientRepository:
             logger.error(f"Error getting patients by status {status} for user {user_id}: {e}")
             return []
     
-    def update_status(self, patient_id: str, user_id: str, status: str, proposed_slot_id: str = None) -> bool:
-        """Update patient status and proposed slot."""
-        try:
-            patient = Patient.query.filter_by(id=patient_id, user_id=user_id).first()
-            if patient:
-                patient.status = status
-                if proposed_slot_id is not None:
-                    patient.proposed_slot_id = proposed_slot_id
-                db.session.commit()
-                return True
-        except Exception as e:
-            logger.error(f"Error updating patient status {patient_id}: {e}")
-            db.session.rollback()
-        return False
-    
     def bulk_create(self, patients_data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """Create multiple patients at once."""
         try:
-            created_patients = []
-            for patient_data in patients_data:
-                patient = Patient.from_dict(patient_data)
-                db.session.add(patient)
-                created_patients.append(patient)
+            created_patients = [Patient.from_dict(patient_data) for patient_data in patients_data]
+            db.session.add_all(created_patients)
+            # Flush and serialize before committing; the commit expires every
+            # instance, so reading them afterwards would re-select each row.
+            db.session.flush()
+            result = [patient.to_dict() for patient in created_patients]
             db.session.commit()
-            return [patient.to_dict() for patient in created_patients]
+            return result
         except Exception as e:
             logger.error(f"Error bulk creating patients: {e}")
             db.session.rollback()
@@ -18,8 +18,12 @@ class ProviderRepository:
     
     def get_provider_names(self, user_id: str) -> List[str]:
         """Get provider names as a list."""
-        providers = self.get_providers(user_id)
-        return [f"{p['first_name']} {p['last_initial'] or ''}".strip() for p in providers]
+        try:
+            rows = db.session.query(Provider.first_name, Provider.last_initial).filter_by(user_id=user_id).all()
+            return [f"{first_name} {last_initial or ''}".strip() for first_name, last_initial in rows]
+        except Exception as e:
+            logger.error(f"Error getting provider names for user {user_id}: {e}")
+            return []
     
     def get_provider_map(self, user_id: str) -> Dict[str, str]:
         """Get a mapping of provider IDs to names."""
@@ -38,6 +42,20 @@ class ProviderRepository:
             db.session.rollback()
             return None
     
+    def bulk_create(self, providers_data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Create multiple providers in a single transaction."""
+        try:
+            created_providers = [Provider.from_dict(provider_data) for provider_data in providers_data]
+            db.session.add_all(created_providers)
+            db.session.flush()
+            result = [provider.to_dict() for provider in created_providers]
+            db.session.commit()
+            return result
+        except Exception as e:
+            logger.error(f"Error bulk creating providers: {e}")
+            db.session.rollback()
+            return []
+    
     def delete(self, record_id: str, user_id: str) -> bool:
         """Delete a provider."""
         try:
@@ -1,5 +1,6 @@
 from typing import List, Dict, Any, Optional
 from src.models.slot import Slot, db
+from src.models.patient import Patient
 import logging
 
 logger = logging.getLogger(__name__)
@@ -7,10 +8,15 @@ logger = logging.getLogger(__name__)
 class SlotRepository:
     """Repository for slot-related database operations with PostgreSQL."""
     
-    def get_available_slots(self, user_id: str) -> List[Dict[str, Any]]:
-        """Get all available slots for a user."""
+    def get_available_slots(self, user_id: str, provider: Optional[str] = None, min_duration: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Get available slots for a user, earliest first, optionally narrowed to a provider and minimum length."""
         try:
-            slots = Slot.query.filter_by(user_id=user_id, status='available').all()
+            query = Slot.query.filter_by(user_id=user_id, status='available')
+            if provider is not None:
+                query = query.filter(Slot.provider == provider)
+            if min_duration:
+                query = query.filter(Slot.duration >= min_duration)
+            slots = query.order_by(Slot.date, Slot.start_time).all()
             return [slot.to_dict() for slot in slots]
         except Exception as e:
             logger.error(f"Error getting available slots for user {user_id}: {e}")
@@ -25,23 +31,6 @@ class SlotRepository:
             logger.error(f"Error getting slots by status {status} for user {user_id}: {e}")
             return []
     
-    def update_status(self, slot_id: str, user_id: str, status: str, proposed_patient_id: str = None, proposed_patient_name: str = None) -> bool:
-        """Update slot status and proposed patient."""
-        try:
-            slot = Slot.query.filter_by(id=slot_id, user_id=user_id).first()
-            if slot:
-                slot.status = status
-                if proposed_patient_id is not None:
-                    slot.proposed_patient_id = proposed_patient_id
-                if proposed_patient_name is not None:
-                    slot.proposed_patient_name = proposed_patient_name
-                db.session.commit()
-                return True
-        except Exception as e:
-            logger.error(f"Error updating slot status {slot_id}: {e}")
-            db.session.rollback()
-        return False
-    
     def get_by_provider(self, user_id: str, provider_id: str) -> List[Dict[str, Any]]:
         """Get slots by provider."""
         try:
@@ -98,6 +87,59 @@ class SlotRepository:
             db.session.rollback()
         return False
     
+    def propose_to_patient(self, slot_id: str, patient_id: str, user_id: str) -> bool:
+        """Mark a slot and a patient as pending on each other in a single transaction."""
+        try:
+            slot = Slot.query.filter_by(id=slot_id, user_id=user_id).first()
+            patient = Patient.query.filter_by(id=patient_id, user_id=user_id).first()
+            if not slot or not patient:
+                return False
+            slot.status = 'pending'
+            slot.proposed_patient_id = patient_id
+            slot.proposed_patient_name = patient.name
+            patient.status = 'pending'
+            patient.proposed_slot_id = slot_id
+            db.session.commit()
+            return True
+        except Exception as e:
+            logger.error(f"Error proposing slot {slot_id} to patient {patient_id}: {e}")
+            db.session.rollback()
+        return False
+    
+    def cancel_proposal(self, slot_id: str, patient_id: str, user_id: str) -> bool:
+        """Return a pending slot and patient to available/waiting in a single transaction."""
+        try:
+            slot = Slot.query.filter_by(id=slot_id, user_id=user_id).first()
+            patient = Patient.query.filter_by(id=patient_id, user_id=user_id).first()
+            if not slot or not patient:
+                return False
+            slot.status = 'available'
+            patient.status = 'waiting'
+            db.session.commit()
+            return True
+        except Exception as e:
+            logger.error(f"Error cancelling proposal of slot {slot_id} to patient {patient_id}: {e}")
+            db.session.rollback()
+        return False
+    
+    def confirm_booking(self, slot_id: str, patient_id: str, user_id: str) -> bool:
+        """Delete a pending slot and its proposed patient in a single transaction."""
+        try:
+            slot = Slot.query.filter_by(id=slot_id, user_id=user_id).first()
+            patient = Patient.query.filter_by(id=patient_id, user_id=user_id).first()
+            if not slot or not patient:
+                return False
+            if slot.proposed_patient_id != patient_id or patient.proposed_slot_id != slot_id:
+                return False
+            db.session.delete(patient)
+            db.session.delete(slot)
+            db.session.commit()
+            return True
+        except Exception as e:
+            logger.error(f"Error confirming booking of slot {slot_id} for patient {patient_id}: {e}")
+            db.session.rollback()
+        return False
+    
     def get_by_id(self, slot_id: str) -> Optional[Dict[str, Any]]:
         """Get slot by ID."""
         try:
@@ -107,10 +149,22 @@ class SlotRepository:
             logger.error(f"Error getting slot {slot_id}: {e}")
             return None
     
+    def get_by_ids(self, slot_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Get several slots in one query, keyed by slot ID."""
+        if not slot_ids:
+            return {}
+        try:
+            slots = Slot.query.filter(Slot.id.in_(slot_ids)).all()
+            return {slot.id: slot.to_dict() for slot in slots}
+        except Exception as e:
+            logger.error(f"Error getting slots {slot_ids}: {e}")
+            return {}
+    
     def get_all_slots(self, user_id: str) -> List[Dict[str, Any]]:
-        """Get all slots for a user."""
+        """Get all slots for a user, earliest first."""
         try:
-            slots = Slot.query.filter_by(user_id=user_id).all()
+            slots = (Slot.query.filter_by(user_id=user_id)
+                     .order_by(Slot.date, Slot.start_time).all())
             return [slot.to_dict() for slot in slots]
         except Exception as e:
             logger.error(f"Error getting all slots for user {user_id}: {e}")
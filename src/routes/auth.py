@@ -81,16 +81,17 @@ def register():
             
             # Insert initial providers from the registration form
             if providers_data:
-                for provider_data in providers_data:
-                    if provider_data.get("first_name"):
-                        provider_to_insert = {
-                            "user_id": user.id,
-                            "first_name": provider_data.get("first_name"),
-                            "last_initial": provider_data.get("last_initial", "")
-                        }
-                        result = provider_repo.create(provider_to_insert)
-                        if not result:
-                            logger.warning(f"Failed to create provider: {provider_data.get('first_name')}")
+                providers_to_insert = [
+                    {
+                        "user_id": user.id,
+                        "first_name": provider_data.get("first_name"),
+                        "last_initial": provider_data.get("last_initial", "")
+                    }
+                    for provider_data in providers_data
+                    if provider_data.get("first_name")
+                ]
+                if providers_to_insert and not provider_repo.bulk_create(providers_to_insert):
+                    logger.warning(f"Failed to create {len(providers_to_insert)} providers from registration form")
                 
                 logger.info(f"Processed {len(providers_data)} providers from registration form")
                 
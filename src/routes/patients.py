@@ -4,10 +4,12 @@ from src.decorators.trial_required import trial_required
 from src.repositories.patient_repository import PatientRepository
 from src.repositories.provider_repository import ProviderRepository
 from src.services.matching_service import MatchingService
+from src.utils.helpers import DAY_NAMES
 import csv
-from io import StringIO
+from io import TextIOWrapper
 import logging
 import json
+import re
 
 logger = logging.getLogger(__name__)
 
@@ -16,6 +18,37 @@ patient_repo = PatientRepository()
 provider_repo = ProviderRepository()
 matching_service = MatchingService()
 
+VALID_URGENCIES = frozenset({"low", "medium", "high"})
+REQUIRED_CSV_COLUMNS = ("name", "phone")
+# Every CSV field read on upload, in unpacking order, with the value used when a row leaves it out
+CSV_COLUMN_DEFAULTS = {
+    "name": "", "phone": "", "email": "", "reason": "", "urgency": "",
+    "appointment_type": "custom", "duration": "30", "provider": "",
+}
+_NON_DIGIT_RE = re.compile(r"\D")
+
+# (day, AM checkbox name, PM checkbox name) for the availability grid on the patient forms
+_DAY_AVAIL_KEYS = tuple(
+    (day, f"avail_{day.lower()}_am", f"avail_{day.lower()}_pm") for day in DAY_NAMES
+)
+
+def _availability_from_form(form):
+    """Build {day: ["AM", "PM"]} from the availability checkboxes, skipping days with neither."""
+    availability = {}
+    for day, am_key, pm_key in _DAY_AVAIL_KEYS:
+        periods = []
+        if form.get(am_key):
+            periods.append("AM")
+        if form.get(pm_key):
+            periods.append("PM")
+        if periods:  # Only add day if AM or PM was selected
+            availability[day] = periods
+    return availability
+
+def _duplicate_key(name, phone):
+    """Key for spotting an existing patient: case-insensitive name and phone digits only."""
+    return name.lower(), _NON_DIGIT_RE.sub("", phone or "")
+
 @patients_bp.route("/add_patient", methods=["POST"])
 @trial_required
 def add_patient():
@@ -30,29 +63,9 @@ def add_patient():
     provider = request.form.get("provider")
 
     # --- Process Availability ---
-    availability_prefs = {}
-    days = [
-        "Monday",
-        "Tuesday",
-        "Wednesday",
-        "Thursday",
-        "Friday",
-        "Saturday",
-        "Sunday",
-    ]
-    for day in days:
-        day_lower = day.lower()
-        am_checked = request.form.get(f"avail_{day_lower}_am")
-        pm_checked = request.form.get(f"avail_{day_lower}_pm")
-        periods = []
-        if am_checked:
-            periods.append("AM")
-        if pm_checked:
-            periods.append("PM")
-        if periods:  # Only add day if AM or PM was selected
-            availability_prefs[day] = periods
+    availability_prefs = _availability_from_form(request.form)
 
-    logging.debug(f"Received availability days/times: {availability_prefs}")
+    logger.debug("Received availability days/times: %s", availability_prefs)
 
     # --- Basic Validation ---
     if not name or not phone:
@@ -119,15 +132,7 @@ def update_patient(patient_id):
     duration = request.form.get("duration")
     urgency = request.form.get("urgency")
     reason = request.form.get("reason", "")
-    availability = {}
-    days = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
-    for day in days:
-        am_key = f"avail_{day}_am"
-        pm_key = f"avail_{day}_pm"
-        periods = []
-        if am_key in request.form: periods.append("AM")
-        if pm_key in request.form: periods.append("PM")
-        if periods: availability[day.capitalize()] = periods
+    availability = _availability_from_form(request.form)
     
     # Convert provider ID to provider name if it's not "no preference"
     provider_name = provider
@@ -198,37 +203,56 @@ def upload_csv():
 
         if file and file.filename.endswith(".csv"):
             try:
-                stream = StringIO(file.stream.read().decode("UTF8"), newline=None)
-                csv_input = csv.DictReader(stream)
+                # Decode the upload incrementally instead of reading it into memory first
+                stream = TextIOWrapper(file.stream, encoding="utf-8-sig", newline="")
+                csv_input = csv.reader(stream)
                 
-                required_fields = ["name", "phone"]
-                header = [h.lower().strip().replace(" ", "_") for h in (csv_input.fieldnames or [])]
-                if not all(rf in header for rf in required_fields):
-                    missing = ", ".join([rf for rf in required_fields if rf not in header])
-                    flash(f"CSV missing required columns: {missing}.", "danger")
+                header = [h.lower().strip().replace(" ", "_") for h in next(csv_input, [])]
+
+                # Resolve column positions once; rows are plain lists indexed by these
+                column_index = {h: i for i, h in enumerate(header)}
+
+                missing = [field for field in REQUIRED_CSV_COLUMNS if field not in column_index]
+                if missing:
+                    flash(f"CSV missing required columns: {', '.join(missing)}.", "danger")
                     return redirect(url_for("main.index") + "#waitlist-table")
 
                 patients_to_add = []
                 
                 # Fetch existing data for validation and duplicate checks
-                existing_patients = patient_repo.get_waitlist(current_user.id)
-                existing_patients_set = set((p['name'].lower(), p['phone']) for p in existing_patients)
+                existing_patients_set = {_duplicate_key(name, phone) for name, phone in patient_repo.get_name_phone_pairs(current_user.id)}
                 
-                providers = provider_repo.get_providers(current_user.id)
-                valid_providers = {f"{p['first_name']} {p['last_initial'] or ''}".strip().lower() for p in providers}
-                valid_providers.add("no preference")
+                # Map lowercased provider names to their stored spelling so matching compares exact names
+                provider_names = {name.lower(): name for name in provider_repo.get_provider_names(current_user.id)}
 
-                valid_appointment_types = {apt['appointment_type'].lower().replace(' ', '_') for apt in (current_user.appointment_types_data or [])}
+                # Optional columns absent from the header are placed after it, so
+                # padding a short row once gives every field a position and default
+                padding = [CSV_COLUMN_DEFAULTS.get(h, "") for h in header]
+                for field, default in CSV_COLUMN_DEFAULTS.items():
+                    if field not in column_index:
+                        column_index[field] = len(padding)
+                        padding.append(default)
+                width = len(padding)
+                (name_i, phone_i, email_i, reason_i, urgency_i,
+                 appointment_type_i, duration_i, provider_i) = (column_index[field] for field in CSV_COLUMN_DEFAULTS)
 
                 # Validation helpers
                 def validate_provider(val):
-                    return val if (val or "no preference").lower() in valid_providers else "no preference"
+                    return provider_names.get((val or "").strip().lower(), "no preference")
+
+                def validate_urgency(val):
+                    urgency = (val or "").strip().lower()
+                    return urgency if urgency in VALID_URGENCIES else "medium"
 
                 for row in csv_input:
-                    norm_row = {k.lower().strip().replace(" ", "_"): v for k, v in row.items()}
-                    name, phone = norm_row.get("name", "").strip(), norm_row.get("phone", "").strip()
+                    if len(row) < width:
+                        row += padding[len(row):]
+                    name, phone = row[name_i].strip(), row[phone_i].strip()
 
-                    if not name or not phone or (name.lower(), phone) in existing_patients_set:
+                    if not name or not phone:
+                        continue
+                    key = _duplicate_key(name, phone)
+                    if key in existing_patients_set:
                         continue
                 
                     # Add user_id to each record for insertion
@@ -236,15 +260,15 @@ def upload_csv():
                         "user_id": current_user.id,
                         "name": name,
                         "phone": phone,
-                        "email": norm_row.get("email", ""),
-                        "reason": norm_row.get("reason", ""),
-                        "urgency": norm_row.get("urgency", "medium").lower(),
-                        "appointment_type": norm_row.get("appointment_type", "custom"),
-                        "duration": norm_row.get("duration", "30"),
-                        "provider": validate_provider(norm_row.get("provider")),
+                        "email": row[email_i],
+                        "reason": row[reason_i],
+                        "urgency": validate_urgency(row[urgency_i]),
+                        "appointment_type": row[appointment_type_i],
+                        "duration": row[duration_i],
+                        "provider": validate_provider(row[provider_i]),
                     }
                     patients_to_add.append(patient_data)
-                    existing_patients_set.add((name.lower(), phone))
+                    existing_patients_set.add(key)
 
                 if patients_to_add:
                     added_patients = patient_repo.bulk_create(patients_to_add)
@@ -270,9 +294,6 @@ def api_find_matches_for_patient(patient_id):
         # Get matching slots for the patient
         matching_slots = matching_service.find_matches_for_patient(patient_id, current_user.id)
         
-        # Get provider names for display
-        provider_map = provider_repo.get_provider_map(current_user.id)
-        
         # Get patient name for display
         patient = patient_repo.get_by_id(patient_id, current_user.id)
         patient_name = patient['name'] if patient else ''
@@ -81,6 +81,8 @@ def payment_success():
         
         # Get trial status for display (user should be logged in by now)
         if current_user.is_authenticated:
+            # The subscription was just created, so don't serve a cached "not subscribed"
+            trial_service.invalidate_subscription_cache(current_user.email)
             trial_status = trial_service.get_trial_status(current_user)
             
             # Clear any trial warnings from session
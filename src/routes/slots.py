@@ -5,9 +5,10 @@ from src.repositories.slot_repository import SlotRepository
 from src.repositories.patient_repository import PatientRepository
 from src.repositories.provider_repository import ProviderRepository
 from src.services.matching_service import MatchingService
-from src.utils.helpers import generate_proposal_message
-from datetime import datetime, timedelta
+from src.utils.helpers import generate_proposal_message, parse_iso_date
+from datetime import datetime
 import logging
+import re
 
 logger = logging.getLogger(__name__)
 
@@ -17,53 +18,57 @@ patient_repo = PatientRepository()
 provider_repo = ProviderRepository()
 matching_service = MatchingService()
 
+_ISO_DATE_RE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+
+def _parse_form_date(value):
+    """Return the date for a YYYY-MM-DD string, or None if it isn't a valid one.
+
+    The pattern rejects most bad input up front, so the cached parse only raises for impossible dates.
+    """
+    if not _ISO_DATE_RE.match(value):
+        return None
+    try:
+        return parse_iso_date(value)
+    except ValueError:
+        return None
+
+def _enrich_slot_for_display(slot):
+    """Add the provider_name and time fields the templates expect to a slot dict."""
+    # Since we now store provider names directly, just use the stored name
+    slot['provider_name'] = slot.get('provider', 'Unknown Provider')
+    # Add time field for template compatibility (using start_time in 24-hour format)
+    slot['time'] = slot.get('start_time', '')
+    # Ensure start_time is also available for consistency
+    slot.setdefault('start_time', slot['time'])
+    return slot
+
 @slots_bp.route("/slots", methods=["GET"])
 @trial_required
 def slots():
-    logger.info(f"\n\n\nSLOTS REQUEST SENT!\n\n\n")
     """Display slots page with available slots and matching functionality."""
     try:
-        logger.info("1")
-        # Get all slots for the user
-        all_slots = slot_repo.get_all_slots(current_user.id)
-        logger.info("2")
+        # Get all slots for the user, with the display fields the template expects
+        all_slots = [_enrich_slot_for_display(slot) for slot in slot_repo.get_all_slots(current_user.id)]
         # Get providers for display
         providers = provider_repo.get_providers(current_user.id)
-        logger.info("3")
         
         # Get current appointment ID from session for matching
         current_appointment_id = session.get("current_appointment_id")
-        logger.info("5")
+        # Get all waiting patients for the general list (also the candidates for matching)
+        waiting_patients = patient_repo.get_by_status(current_user.id, "waiting")
+        
         # If we have a current appointment, find matches
         eligible_patients = []
         ineligible_patients = []
         current_slot = None
-        logger.info("6")
         if current_appointment_id:
-            current_slot = slot_repo.get_by_id(current_appointment_id)
+            # The user's slots are already loaded, so take the current one from them
+            current_slot = next((s for s in all_slots if s['id'] == current_appointment_id), None)
             if current_slot:
-                # Add time field for template compatibility
-                current_slot['time'] = current_slot.get('start_time', '')
-                # Enrich current_slot with provider_name for display
-                current_slot['provider_name'] = current_slot.get('provider', 'Unknown Provider')
                 eligible_patients, ineligible_patients = matching_service.find_matches_for_slot(
-                    current_appointment_id, current_user.id
+                    current_appointment_id, current_user.id, slot=current_slot, patients=waiting_patients
                 )
-        logger.info("7")
-        # Get all waiting patients for the general list
-        waiting_patients = patient_repo.get_by_status(current_user.id, "waiting")
-        logger.info("8")
-        logger.info(f"SLOTS TO DISPLAY: {all_slots}")
-
-        # Enrich slots with provider_name for display and add time field for template compatibility
-        for slot in all_slots:
-            # Since we now store provider names directly, just use the stored name
-            slot['provider_name'] = slot.get('provider', 'Unknown Provider')
-            # Add time field for template compatibility (using start_time in 24-hour format)
-            slot['time'] = slot.get('start_time', '')
-            # Ensure start_time is also available for consistency
-            if 'start_time' not in slot:
-                slot['start_time'] = slot.get('time', '')
+        logger.debug("Slots to display: %s", all_slots)
         
         return render_template(
             "slots.html",
@@ -82,10 +87,11 @@ def slots():
         flash("A critical error occurred. Please try again.", "danger")
         return redirect(url_for('main.index'))
 
-@slots_bp.route("/add_cancelled_appointment", methods=["POST"])
-@trial_required
-def add_cancelled_appointment():
-    """Add a new cancelled appointment (open slot)"""
+def _parse_slot_form():
+    """Read and validate the open slot form shared by the add and update routes.
+
+    Returns (slot_data, None) on success or (None, error message) on failure.
+    """
     provider_id = request.form.get("provider")
     slot_date = request.form.get("date")
     slot_time_str = request.form.get("time")
@@ -93,34 +99,49 @@ def add_cancelled_appointment():
     notes = request.form.get("notes", "")
 
     if not all([provider_id, slot_date, slot_time_str, duration]):
-        flash("All required fields must be filled", "danger")
-        return redirect(url_for("slots.slots"))
+        return None, "All required fields must be filled"
 
-    # Convert provider ID to provider name
-    provider = provider_repo.get_by_id(provider_id)
-    if not provider:
-        flash("Invalid provider selected", "danger")
-        return redirect(url_for("slots.slots"))
-    
-    provider_name = f"{provider['first_name']} {provider['last_initial'] or ''}".strip()
+    # Validate date format
+    if _parse_form_date(slot_date) is None:
+        return None, "Invalid date format. Please use YYYY-MM-DD."
 
     # Validate time format (24-hour)
     try:
         time_obj = datetime.strptime(slot_time_str, "%H:%M").time()
         start_time = time_obj.strftime("%H:%M")
     except ValueError:
-        flash("Invalid time format. Please use HH:MM (24-hour format).", "danger")
+        return None, "Invalid time format. Please use HH:MM (24-hour format)."
+
+    # Validate duration
+    if not duration.isdigit():
+        return None, "Invalid duration. Please enter the length in minutes."
+
+    # Convert provider ID to provider name (after the cheap checks, so bad input skips the query)
+    provider = provider_repo.get_by_id(provider_id)
+    if not provider:
+        return None, "Invalid provider selected"
+
+    provider_name = f"{provider['first_name']} {provider['last_initial'] or ''}".strip()
+
+    return {
+        "provider": provider_name,
+        "date": slot_date,
+        "start_time": start_time,
+        "duration": duration,
+        "notes": notes
+    }, None
+
+@slots_bp.route("/add_cancelled_appointment", methods=["POST"])
+@trial_required
+def add_cancelled_appointment():
+    """Add a new cancelled appointment (open slot)"""
+    slot_data, error = _parse_slot_form()
+    if error:
+        flash(error, "danger")
         return redirect(url_for("slots.slots"))
-    
+
     try:
-        slot_data = {
-            "provider": provider_name,
-            "start_time": start_time,
-            "date": slot_date,
-            "duration": duration,
-            "notes": notes,
-            "user_id": current_user.id
-        }
+        slot_data["user_id"] = current_user.id
         
         result = slot_repo.create(slot_data)
         if result:
@@ -152,51 +173,12 @@ def remove_cancelled_slot(appointment_id):
 @trial_required
 def update_cancelled_slot(appointment_id):
     """Update a cancelled appointment (open slot)"""
-    provider_id = request.form.get("provider")
-    slot_date = request.form.get("date")
-    slot_time_str = request.form.get("time")
-    duration = request.form.get("duration")
-    notes = request.form.get("notes", "")
-
-    if not all([provider_id, slot_date, slot_time_str, duration]):
-        flash("All required fields must be filled", "danger")
-        return redirect(url_for("slots.slots"))
-
-    # Convert provider ID to provider name
-    provider = provider_repo.get_by_id(provider_id)
-    if not provider:
-        flash("Invalid provider selected", "danger")
-        return redirect(url_for("slots.slots"))
-    
-    provider_name = f"{provider['first_name']} {provider['last_initial'] or ''}".strip()
-
-    # Validate time format (24-hour)
-    try:
-        time_obj = datetime.strptime(slot_time_str, "%H:%M").time()
-        start_time = time_obj.strftime("%H:%M")
-    except ValueError:
-        flash("Invalid time format. Please use HH:MM (24-hour format).", "danger")
-        return redirect(url_for("slots.slots"))
-    
-    # Calculate start_time and end_time
-    try:
-        start_dt = datetime.strptime(slot_time_str, "%H:%M")
-        end_dt = start_dt + timedelta(minutes=int(duration))
-        start_time = start_dt.strftime("%H:%M")
-        end_time = end_dt.strftime("%H:%M")
-    except Exception as e:
-        flash(f"Error calculating end time: {e}", "danger")
+    update_data, error = _parse_slot_form()
+    if error:
+        flash(error, "danger")
         return redirect(url_for("slots.slots"))
 
     try:
-        update_data = {
-            "provider": provider_name,
-            "date": slot_date,
-            "start_time": start_time,
-            "duration": duration,
-            "notes": notes
-        }
-        
         success = slot_repo.update(appointment_id, current_user.id, update_data)
         if success:
             flash("Open slot updated successfully", "success")
@@ -223,7 +205,6 @@ def propose_slot(slot_id, patient_id):
     """Marks a slot and patient as pending confirmation."""
     try:
         patient = patient_repo.get_by_id(patient_id, current_user.id)
-        patient_name = patient.get("name", "Unknown") if patient else "Unknown"
         slot = slot_repo.get_by_id(slot_id)
 
         # Generate proposal message using template
@@ -231,17 +212,8 @@ def propose_slot(slot_id, patient_id):
             proposal_message = generate_proposal_message(current_user, patient, slot)
             session['last_proposal_message'] = proposal_message
 
-        # Update slot status
-        slot_success = slot_repo.update_status(
-            slot_id, current_user.id, "pending", patient_id, patient_name
-        )
-
-        # Update patient status
-        patient_success = patient_repo.update_status(
-            patient_id, current_user.id, "pending", slot_id
-        )
-
-        if slot_success and patient_success:
+        # Mark both as pending in one commit; on failure neither record changes
+        if slot_repo.propose_to_patient(slot_id, patient_id, current_user.id):
             flash("Slot proposed and marked as pending confirmation.", "info")
             session.pop("current_appointment_id", None)
         else:
@@ -250,9 +222,6 @@ def propose_slot(slot_id, patient_id):
     except Exception as e:
         logger.error(f"Error proposing slot: {e}", exc_info=True)
         flash("Error proposing slot. The slot may have been taken or the patient is no longer available.", "danger")
-        # Attempt to roll back state if something went wrong
-        slot_repo.update_status(slot_id, current_user.id, "available")
-        patient_repo.update_status(patient_id, current_user.id, "waiting")
 
     return redirect(request.referrer or url_for('main.index'))
 
@@ -261,20 +230,11 @@ def propose_slot(slot_id, patient_id):
 def confirm_booking(slot_id, patient_id):
     """Confirms the booking, removing the patient and the slot."""
     try:
-        # For safety, ensure the slot and patient are in the correct pending state before deleting.
-        slot = slot_repo.get_by_id(slot_id)
-        patient = patient_repo.get_by_id(patient_id, current_user.id)
+        # The repository checks that the slot and patient are still paired and
+        # deletes both in one commit, so a failure cannot leave just one removed.
+        if not slot_repo.confirm_booking(slot_id, patient_id, current_user.id):
+            raise Exception("Slot or patient not found, or pending data mismatch.")
 
-        if not slot or not patient:
-            raise Exception("Slot or patient not found.")
-
-        if slot.get("proposed_patient_id") != patient_id or patient.get("proposed_slot_id") != slot_id:
-            raise Exception("Mismatch in pending slot/patient data.")
-
-        # If checks pass, delete both records.
-        patient_repo.delete(patient_id, current_user.id)
-        slot_repo.delete(slot_id, current_user.id)
-        
         flash("Booking confirmed. Patient removed from patients list and slot closed.", "success")
     except Exception as e:
         logger.error(f"Error confirming booking: {e}", exc_info=True)
@@ -287,10 +247,7 @@ def confirm_booking(slot_id, patient_id):
 def cancel_proposal(slot_id, patient_id):
     """Cancels a pending proposal, making the slot and patient available again."""
     try:
-        slot_success = slot_repo.update_status(slot_id, current_user.id, "available")
-        patient_success = patient_repo.update_status(patient_id, current_user.id, "waiting")
-
-        if slot_success and patient_success:
+        if slot_repo.cancel_proposal(slot_id, patient_id, current_user.id):
             flash("Proposal cancelled. Slot and patient are available again.", "info")
         else:
             raise Exception("Failed to reset slot or patient.")
@@ -1,13 +1,19 @@
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, FrozenSet, Optional, Tuple
 from src.repositories.patient_repository import PatientRepository
 from src.repositories.slot_repository import SlotRepository
 from src.repositories.provider_repository import ProviderRepository
-from src.utils.helpers import wait_time_to_days, wait_time_to_minutes
+from src.utils.helpers import DAY_NAMES, parse_iso_date, parse_iso_time, patient_wait_days, urgency_sort_key
 import logging
 from datetime import datetime, time, timedelta
 
 logger = logging.getLogger(__name__)
 
+# Time ranges covered by each availability period a patient can select
+PERIOD_RANGES = (
+    ('AM', time(0, 0, 0), time(11, 59, 59)),
+    ('PM', time(12, 0, 0), time(23, 59, 59)),
+)
+
 class MatchingService:
     """Service for handling patient-slot matching logic."""
     
@@ -16,22 +22,31 @@ class MatchingService:
         self.slot_repo = SlotRepository()
         self.provider_repo = ProviderRepository()
     
-    def find_matches_for_slot(self, slot_id: str, user_id: str) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
-        """Find eligible and ineligible patients for a specific slot."""
+    def find_matches_for_slot(self, slot_id: str, user_id: str, slot: Optional[Dict[str, Any]] = None,
+                              patients: Optional[List[Dict[str, Any]]] = None) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """Find eligible and ineligible patients for a specific slot.
+        
+        Callers that already hold the slot or the waiting patients can pass them in to skip the lookups.
+        """
         try:
             # Get the slot details
-            slot = self.slot_repo.get_by_id(slot_id)
+            if slot is None:
+                slot = self.slot_repo.get_by_id(slot_id)
             if not slot:
                 return [], []
             
             # Get all waiting patients
-            patients = self.patient_repo.get_by_status(user_id, "waiting")
+            if patients is None:
+                patients = self.patient_repo.get_by_status(user_id, "waiting")
             
             eligible_patients = []
             ineligible_patients = []
             
+            # Parse the slot's day and time range once rather than once per patient
+            slot_window = self._get_slot_window(slot)
+            
             for patient in patients:
-                if self._is_patient_eligible_for_slot(patient, slot):
+                if self._is_patient_eligible_for_slot(patient, slot, slot_window):
                     eligible_patients.append(patient)
                 else:
                     ineligible_patients.append(patient)
@@ -51,49 +66,42 @@ class MatchingService:
     def find_matches_for_patient(self, patient_id: str, user_id: str) -> List[Dict[str, Any]]:
         """Find available slots for a specific patient."""
         try:
-            logger.info(f"\n\n\nFINDING MATCHES FOR PATIENT {patient_id}\n\n\n")
+            logger.debug("Finding matches for patient %s", patient_id)
             # Get the patient details
             patient = self.patient_repo.get_by_id(patient_id, user_id)
             if not patient:
                 return []
 
-            # Get all available slots
-            slots = self.slot_repo.get_available_slots(user_id)
+            # Let the database drop slots with the wrong provider or too short a length; the
+            # results come back ordered by date and time, so matches come out sorted
+            preferred_provider = patient.get('provider')
+            if not preferred_provider or preferred_provider == 'no preference':
+                preferred_provider = None
+            slots = self.slot_repo.get_available_slots(
+                user_id, provider=preferred_provider, min_duration=int(patient.get('duration') or 0)
+            )
             
-            # Log patient info for debugging
-            logger.info(f"[MATCHING] Patient {patient.get('name')} ({patient_id}) availability: {patient.get('availability')}")
-            logger.info(f"[MATCHING] Patient duration requirement: {patient.get('duration')} min")
-            logger.info(f"[MATCHING] Patient preferred provider: {patient.get('provider', 'no preference')}")
-            logger.info(f"[MATCHING] Found {len(slots)} total available slots")
-
             matching_slots = []
             
             # Use the same logic as find_matches_for_slot but in reverse
             for slot in slots:
-                logger.info(f"[DEBUG] Checking slot: {slot.get('date')} {slot.get('start_time')} ({slot.get('duration')} min) with {slot.get('provider', 'Unknown Provider')}")
-                
                 # Use the unified compatibility checking method
-                if self._is_slot_suitable_for_patient(slot, patient):
-                    logger.info(f"[MATCH] Slot {slot.get('date')} {slot.get('start_time')} matches patient requirements")
-                    
+                if self._is_patient_eligible_for_slot(patient, slot, self._get_slot_window(slot)):
                     # Add provider_name for frontend compatibility
                     slot_copy = slot.copy()
                     slot_copy['provider_name'] = slot.get('provider', 'Unknown Provider')
                     matching_slots.append(slot_copy)
-                else:
-                    logger.info(f"[NO MATCH] Slot {slot.get('date')} {slot.get('start_time')} does not match patient requirements")
 
-            # Sort by date and time, handling missing 'start_time' fields gracefully
-            matching_slots.sort(key=lambda s: (s.get('date', ''), s.get('start_time', '')))
-            
-            logger.info(f"[MATCHING] Found {len(matching_slots)} matching slots for patient {patient.get('name')}")
+            logger.info("[MATCHING] Patient %s: %d of %d candidate slots match (provider %s, %s min, availability %s)",
+                        patient_id, len(matching_slots), len(slots), patient.get('provider', 'no preference'),
+                        patient.get('duration'), patient.get('availability'))
             return matching_slots
             
         except Exception as e:
             logger.error(f"Error finding matches for patient {patient_id}: {e}")
             return []
     
-    def _is_patient_eligible_for_slot(self, patient: Dict[str, Any], slot: Dict[str, Any]) -> bool:
+    def _is_patient_eligible_for_slot(self, patient: Dict[str, Any], slot: Dict[str, Any], slot_window: Optional[Tuple[str, FrozenSet[str]]]) -> bool:
         """Check if a patient is eligible for a specific slot."""
         # Check provider preference
         if patient.get('provider') and patient['provider'] != 'no preference':
@@ -106,64 +114,62 @@ class MatchingService:
                 return False
         
         # Check availability and duration using the same logic as find_matches_for_patient
-        if not self._check_comprehensive_compatibility(patient, slot):
+        if not self._check_comprehensive_compatibility(patient, slot, slot_window):
             return False
         
         return True
     
-    def _is_slot_suitable_for_patient(self, slot: Dict[str, Any], patient: Dict[str, Any]) -> bool:
-        """Check if a slot is suitable for a specific patient."""
-        # Check provider preference
-        if patient.get('provider') and patient['provider'] != 'no preference':
-            if str(slot.get('provider')) != patient['provider']:
-                return False
+    def _get_slot_window(self, slot: Dict[str, Any]) -> Optional[Tuple[str, FrozenSet[str]]]:
+        """Get (day name, overlapping periods) for a slot, or None if its date/time can't be read.
         
-        # Check appointment type compatibility
-        if patient.get('appointment_type') and slot.get('appointment_type'):
-            if patient['appointment_type'] != slot['appointment_type']:
-                return False
-        
-        # Check availability and duration using the same logic as find_matches_for_patient
-        if not self._check_comprehensive_compatibility(patient, slot):
-            return False
-        
-        return True
-    
-    def _check_comprehensive_compatibility(self, patient: Dict[str, Any], slot: Dict[str, Any]) -> bool:
-        """Check if patient availability and duration are compatible with slot using the same logic as find_matches_for_patient."""
-        patient_availability = patient.get('availability', {})
+        Depends only on the slot, so callers compute it once and reuse it for every patient.
+        """
         slot_date = slot.get('date')
         slot_start_time = slot.get('start_time')
         slot_duration = slot.get('duration', 0)
-        desired_duration = int(patient.get('duration', 0))
-        
-        if not slot_date or not slot_start_time:
-            return True
         
-        # Check duration compatibility first
-        if slot_duration < desired_duration:
-            return False
+        if not slot_date or not slot_start_time or not slot_duration:
+            return None
         
         # Convert date to day name
         try:
-            slot_datetime = datetime.strptime(slot_date, '%Y-%m-%d')
-            slot_day_name = slot_datetime.strftime('%A')  # Monday, Tuesday, etc.
+            slot_day_name = DAY_NAMES[parse_iso_date(slot_date).weekday()]  # Monday, Tuesday, etc.
         except:
-            return True
+            return None
         
         # Parse slot start time
         try:
-            slot_start_time_obj = datetime.strptime(slot_start_time, '%H:%M').time()
+            slot_start_time_obj = parse_iso_time(slot_start_time)
         except:
-            return True
+            return None
         
         # Calculate slot end time from start time and duration
-        if slot_start_time_obj and slot_duration:
-            start_dt = datetime.combine(datetime.today(), slot_start_time_obj)
-            end_dt = start_dt + timedelta(minutes=slot_duration)
-            slot_end_time_obj = end_dt.time()
-        else:
+        start_dt = datetime.combine(datetime.today(), slot_start_time_obj)
+        slot_end_time_obj = (start_dt + timedelta(minutes=slot_duration)).time()
+        
+        # Resolve which availability periods the slot overlaps
+        slot_periods = frozenset(
+            period for period, avail_start, avail_end in PERIOD_RANGES
+            if slot_start_time_obj < avail_end and slot_end_time_obj > avail_start
+        )
+        return slot_day_name, slot_periods
+    
+    def _check_comprehensive_compatibility(self, patient: Dict[str, Any], slot: Dict[str, Any], slot_window: Optional[Tuple[str, FrozenSet[str]]]) -> bool:
+        """Check if patient availability and duration are compatible with slot using the same logic as find_matches_for_patient."""
+        patient_availability = patient.get('availability', {})
+        desired_duration = int(patient.get('duration', 0))
+        
+        if not slot.get('date') or not slot.get('start_time'):
+            return True
+        
+        # Check duration compatibility first
+        if slot.get('duration', 0) < desired_duration:
+            return False
+        
+        # Slot date/time couldn't be read - don't exclude the patient over it
+        if slot_window is None:
             return True
+        slot_day_name, slot_periods = slot_window
         
         # If patient has no availability restrictions (flexible), they match any slot
         if not patient_availability:
@@ -174,39 +180,19 @@ class MatchingService:
             return False
         
         # Check overlap with patient's availability periods
-        am_range = (time(0, 0, 0), time(11, 59, 59))
-        pm_range = (time(12, 0, 0), time(23, 59, 59))
-        
-        patient_periods = patient_availability[slot_day_name]
-        for period in patient_periods:
-            if period == 'AM':
-                avail_start, avail_end = am_range
-            elif period == 'PM':
-                avail_start, avail_end = pm_range
-            else:
-                continue
-            
-            # Check if slot time overlaps with patient availability
-            if slot_start_time_obj < avail_end and slot_end_time_obj > avail_start:
-                return True
-        
-        return False
+        return not slot_periods.isdisjoint(patient_availability[slot_day_name])
     
     def _check_availability_compatibility(self, patient: Dict[str, Any], slot: Dict[str, Any]) -> bool:
         """Check if patient availability is compatible with slot."""
         # Use the comprehensive compatibility check for consistency
-        return self._check_comprehensive_compatibility(patient, slot)
+        return self._check_comprehensive_compatibility(patient, slot, self._get_slot_window(slot))
     
     def _get_eligible_sort_key(self, patient: Dict[str, Any]) -> Tuple[int, int, int]:
         """Get sort key for eligible patients (urgency, wait time, name)."""
-        urgency_order = {'high': 0, 'medium': 1, 'low': 2}
-        urgency = urgency_order.get(patient.get('urgency', 'medium'), 1)
-        wait_days = wait_time_to_days(patient.get('wait_time', '0 days'))
-        name = patient.get('name', '').lower()
-        return (urgency, -wait_days, name)
+        return urgency_sort_key(patient)
     
     def _get_waitlist_sort_key(self, patient: Dict[str, Any]) -> Tuple[int, str]:
         """Get sort key for waitlist patients (wait time, name)."""
-        wait_days = wait_time_to_days(patient.get('wait_time', '0 days'))
+        wait_days = patient_wait_days(patient)
         name = patient.get('name', '').lower()
         return (-wait_days, name) 
\ No newline at end of file
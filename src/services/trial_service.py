@@ -4,6 +4,7 @@ Prevents client-side manipulation of trial periods and subscriptions.
 """
 
 import logging
+import time
 from datetime import datetime, timedelta
 from typing import Dict, Optional, Tuple
 from src.utils.stripe_checker import has_active_subscription
@@ -20,15 +21,22 @@ class TrialService:
     # Trial configuration (server-side only)
     TRIAL_DAYS = 30
     WARNING_DAYS = 3  # Warn user when 3 days left
+    SUBSCRIPTION_CACHE_SECONDS = 60  # Reuse a Stripe subscription lookup for this long
     
     def __init__(self):
         self.logger = logging.getLogger(__name__)
+        # email -> (is_subscriber, monotonic time of the Stripe lookup)
+        self._subscription_cache = {}
     
-    def get_trial_status(self, user: User) -> Dict:
+    def get_trial_status(self, user: User, check_subscription_in_trial: bool = True) -> Dict:
         """
         Get comprehensive trial status for a user.
         This is the single source of truth for trial validation.
         
+        Access during the trial never depends on Stripe, so callers that only need
+        has_access can pass check_subscription_in_trial=False to skip the lookup;
+        is_subscriber is then False for users still in their trial.
+        
         Returns:
             {
                 'has_access': bool,           # Can user access the app?
@@ -52,7 +60,10 @@ class TrialService:
             days_remaining = max(0, self.TRIAL_DAYS - days_since_creation)
             
             # Check Stripe subscription status
-            is_subscriber = self._check_stripe_subscription(user.email)
+            if days_remaining > 0 and not check_subscription_in_trial:
+                is_subscriber = False
+            else:
+                is_subscriber = self._check_stripe_subscription(user.email)
             
             # Determine access type and permissions - prioritize trial period over subscription status
             if days_remaining > 0:
@@ -125,13 +136,29 @@ class TrialService:
     def _check_stripe_subscription(self, email: str) -> bool:
         """
         Check Stripe subscription status with error handling.
+        Results are cached briefly since every protected page load checks access.
+        Payment success and the Stripe webhook invalidate the entry when the status changes.
         """
+        cached = self._subscription_cache.get(email)
+        now = time.monotonic()
+        if cached and now - cached[1] < self.SUBSCRIPTION_CACHE_SECONDS:
+            return cached[0]
+        
         try:
-            return has_active_subscription(email)
+            is_subscriber = has_active_subscription(email)
         except Exception as e:
             self.logger.warning(f"Stripe subscription check failed for {email}: {e}")
             # Fail gracefully - assume no subscription on Stripe error
             return False
+        
+        self._subscription_cache[email] = (is_subscriber, now)
+        return is_subscriber
+    
+    def invalidate_subscription_cache(self, email: str) -> None:
+        """
+        Forget the cached subscription status for a user, e.g. when Stripe reports a change.
+        """
+        self._subscription_cache.pop(email, None)
     
     def _get_trial_warning_message(self, days_remaining: int) -> Optional[str]:
         """
@@ -1,23 +1,59 @@
 import re
-from datetime import datetime
+from datetime import date, datetime, time
+from functools import lru_cache
 
+_WAIT_DAYS_RE = re.compile(r'(\d+)\s*days?', re.IGNORECASE)
+
+URGENCY_ORDER = {'high': 0, 'medium': 1, 'low': 2}
+
+# Indexed by date.weekday(); these are the day keys used in patient availability
+DAY_NAMES = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
+
+def wait_days_since(added_at):
+    """Whole days a patient has been waiting since they were added, or None if unknown."""
+    if not added_at:
+        return None
+    return max(0, (datetime.utcnow() - added_at).days)
+
+def format_wait_days(days):
+    """Format a wait in days for display, e.g. "3 days"."""
+    if days is None:
+        return None
+    return f"{days} day" if days == 1 else f"{days} days"
+
+def patient_wait_days(patient):
+    """Days a patient dict has been waiting, preferring the numeric field over parsing the display string."""
+    days = patient.get('wait_days')
+    if days is not None:
+        return days
+    return wait_time_to_days(patient.get('wait_time', '0 days'))
+
+@lru_cache(maxsize=256)
+def parse_iso_date(date_str):
+    """Parse a YYYY-MM-DD string into a date. Cached since the same few dates recur across slots."""
+    return date.fromisoformat(date_str)
+
+@lru_cache(maxsize=256)
+def parse_iso_time(time_str):
+    """Parse an HH:MM string into a time. Cached for the same reason as parse_iso_date."""
+    return time.fromisoformat(time_str)
+
+@lru_cache(maxsize=1024)
 def wait_time_to_days(wait_time_str):
     """Convert wait time string to number of days."""
     if not wait_time_str:
         return 0
-    match = re.match(r'(\d+)\s*days?', wait_time_str.lower())
+    match = _WAIT_DAYS_RE.match(wait_time_str)
     if match:
         return int(match.group(1))
     return 0
 
-def wait_time_to_minutes(wait_time_str):
-    """Convert wait time string to number of minutes."""
-    if not wait_time_str:
-        return 0
-    match = re.match(r'(\d+)\s*minutes?', wait_time_str.lower())
-    if match:
-        return int(match.group(1))
-    return 0
+def urgency_sort_key(patient):
+    """Sort key ordering patients by urgency, then longest wait, then name."""
+    urgency = URGENCY_ORDER.get(patient.get('urgency', 'medium'), 1)
+    wait_days = patient_wait_days(patient)
+    name = patient.get('name', '').lower()
+    return (urgency, -wait_days, name)
 
 def generate_proposal_message(user, patient, slot):
     """Generate proposal message using user's template."""
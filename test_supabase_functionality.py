@@ -6,6 +6,7 @@ Tests all CRUD operations, relationships, and edge cases
 
 import sys
 import os
+import io
 import json
 import uuid
 import time
@@ -56,16 +57,22 @@ class DatabaseTester:
                 # Test 5: Slot Operations
                 self.test_slot_operations()
                 
-                # Test 6: Complex Queries
+                # Test 6: Slot Transactions
+                self.test_slot_transactions()
+                
+                # Test 7: Complex Queries
                 self.test_complex_queries()
                 
-                # Test 7: Bulk Operations
+                # Test 8: Bulk Operations
                 self.test_bulk_operations()
                 
-                # Test 8: Error Handling
+                # Test 9: CSV Upload
+                self.test_csv_upload()
+                
+                # Test 10: Error Handling
                 self.test_error_handling()
                 
-                # Test 9: Performance
+                # Test 11: Performance
                 self.test_performance()
                 
                 print("\n🎉 ALL TESTS COMPLETED SUCCESSFULLY!")
@@ -252,6 +259,95 @@ class DatabaseTester:
         assert success
         print("✅ Slot update successful")
         
+    def create_transaction_pair(self, label):
+        """Create a fresh available slot and waiting patient for transaction tests"""
+        slot = self.slot_repo.create({
+            "user_id": self.test_user_id,
+            "date": "2025-08-02",
+            "start_time": "14:00",
+            "duration": 30,
+            "provider": "Dr. Test T",
+            "appointment_type": "Test Type 1",
+            "reason": f"{label} slot",
+            "status": "available"
+        })
+        patient = self.patient_repo.create({
+            "user_id": self.test_user_id,
+            "name": f"{label} Patient",
+            "phone": "555-0456",
+            "email": f"{label.lower()}-{int(time.time())}@test.com",
+            "reason": "Test reason",
+            "urgency": "high",
+            "appointment_type": "Test Type 1",
+            "duration": 30,
+            "provider": "Dr. Test T",
+            "status": "waiting",
+            "availability": json.dumps({"Saturday": ["9:00 AM", "5:00 PM"]})
+        })
+        assert slot is not None and patient is not None
+        self.test_data_ids['slots'].append(slot['id'])
+        self.test_data_ids['patients'].append(patient['id'])
+        return slot, patient
+        
+    def assert_pair_state(self, slot_id, patient_id, slot_status, patient_status):
+        """Re-read a slot and patient and check both statuses"""
+        db.session.expire_all()
+        slot = self.slot_repo.get_by_id(slot_id)
+        patient = self.patient_repo.get_by_id(patient_id, self.test_user_id)
+        assert slot is not None and patient is not None
+        assert slot['status'] == slot_status
+        assert patient['status'] == patient_status
+        return slot, patient
+        
+    def test_slot_transactions(self):
+        """Test the slot/patient proposal transactions"""
+        print("\n🔗 Testing Slot Transactions...")
+        
+        slot, patient = self.create_transaction_pair("Proposal")
+        missing_id = str(uuid.uuid4())
+        
+        # PROPOSE with a missing slot or patient changes nothing
+        assert not self.slot_repo.propose_to_patient(missing_id, patient['id'], self.test_user_id)
+        assert not self.slot_repo.propose_to_patient(slot['id'], missing_id, self.test_user_id)
+        self.assert_pair_state(slot['id'], patient['id'], "available", "waiting")
+        print("✅ Proposal with missing IDs rejected")
+        
+        # PROPOSE
+        success = self.slot_repo.propose_to_patient(slot['id'], patient['id'], self.test_user_id)
+        assert success
+        pending_slot, pending_patient = self.assert_pair_state(slot['id'], patient['id'], "pending", "pending")
+        assert pending_slot['proposed_patient_id'] == patient['id']
+        assert pending_slot['proposed_patient_name'] == "Proposal Patient"
+        assert pending_patient['proposed_slot_id'] == slot['id']
+        print("✅ Slot proposal successful")
+        
+        # CANCEL with a missing slot or patient changes nothing
+        assert not self.slot_repo.cancel_proposal(missing_id, patient['id'], self.test_user_id)
+        assert not self.slot_repo.cancel_proposal(slot['id'], missing_id, self.test_user_id)
+        self.assert_pair_state(slot['id'], patient['id'], "pending", "pending")
+        print("✅ Proposal cancellation with missing IDs rejected")
+        
+        # CANCEL
+        success = self.slot_repo.cancel_proposal(slot['id'], patient['id'], self.test_user_id)
+        assert success
+        self.assert_pair_state(slot['id'], patient['id'], "available", "waiting")
+        print("✅ Proposal cancellation successful")
+        
+        # CONFIRM with a missing slot or patient changes nothing
+        assert self.slot_repo.propose_to_patient(slot['id'], patient['id'], self.test_user_id)
+        assert not self.slot_repo.confirm_booking(missing_id, patient['id'], self.test_user_id)
+        assert not self.slot_repo.confirm_booking(slot['id'], missing_id, self.test_user_id)
+        self.assert_pair_state(slot['id'], patient['id'], "pending", "pending")
+        print("✅ Booking confirmation with missing IDs rejected")
+        
+        # CONFIRM
+        success = self.slot_repo.confirm_booking(slot['id'], patient['id'], self.test_user_id)
+        assert success
+        db.session.expire_all()
+        assert self.slot_repo.get_by_id(slot['id']) is None
+        assert self.patient_repo.get_by_id(patient['id'], self.test_user_id) is None
+        print("✅ Booking confirmation successful")
+        
     def test_complex_queries(self):
         """Test complex database queries and relationships"""
         print("\n🔍 Testing Complex Queries...")
@@ -310,6 +406,101 @@ class DatabaseTester:
         assert bulk_count >= 5
         print("✅ Bulk data retrieval successful")
         
+        # Bulk patient creation in a single transaction
+        stamp = int(time.time())
+        created_patients = self.patient_repo.bulk_create([
+            {
+                "user_id": self.test_user_id,
+                "name": f"Batch Patient {i+1}",
+                "phone": f"555-{2000+i}",
+                "email": f"batch{i+1}-{stamp}@test.com",
+                "reason": f"Batch test reason {i+1}",
+                "urgency": "low",
+                "appointment_type": "Test Type 1",
+                "duration": 30,
+                "provider": "Dr. Test T",
+                "availability": json.dumps({"Monday": ["9:00 AM", "5:00 PM"]})
+            }
+            for i in range(3)
+        ])
+        assert len(created_patients) == 3
+        for patient in created_patients:
+            assert patient['id'] is not None
+            self.test_data_ids['patients'].append(patient['id'])
+        assert [p['name'] for p in created_patients] == [f"Batch Patient {i+1}" for i in range(3)]
+        print("✅ Patient bulk_create successful")
+        
+        # Name/phone pairs include the batch
+        pairs = self.patient_repo.get_name_phone_pairs(self.test_user_id)
+        for i in range(3):
+            assert (f"Batch Patient {i+1}", f"555-{2000+i}") in [tuple(pair) for pair in pairs]
+        print("✅ Patient name/phone retrieval successful")
+        
+        # Bulk provider creation in a single transaction
+        created_providers = self.provider_repo.bulk_create([
+            {"user_id": self.test_user_id, "first_name": f"Dr. Batch{i+1}", "last_initial": "B"}
+            for i in range(3)
+        ])
+        assert len(created_providers) == 3
+        for provider in created_providers:
+            assert provider['id'] is not None
+            self.test_data_ids['providers'].append(provider['id'])
+        provider_names = [p['first_name'] for p in self.provider_repo.get_providers(self.test_user_id)]
+        for i in range(3):
+            assert f"Dr. Batch{i+1}" in provider_names
+        print("✅ Provider bulk_create successful")
+        
+        # Slot lookup by IDs in one query
+        bulk_slots = []
+        for i in range(3):
+            slot = self.slot_repo.create({
+                "user_id": self.test_user_id,
+                "date": "2025-08-03",
+                "start_time": f"{9+i:02d}:00",
+                "duration": 30,
+                "provider": "Dr. Test T",
+                "appointment_type": "Test Type 1",
+                "reason": "Bulk cancelled appointment"
+            })
+            assert slot is not None
+            bulk_slots.append(slot)
+            self.test_data_ids['slots'].append(slot['id'])
+        slot_ids = [slot['id'] for slot in bulk_slots]
+        slots_by_id = self.slot_repo.get_by_ids(slot_ids + [str(uuid.uuid4())])
+        assert set(slots_by_id) == set(slot_ids)
+        for slot in bulk_slots:
+            assert slots_by_id[slot['id']]['start_time'] == slot['start_time']
+        assert self.slot_repo.get_by_ids([]) == {}
+        print("✅ Slot retrieval by IDs successful")
+        
+    def test_csv_upload(self):
+        """Test CSV upload column mapping through the upload route"""
+        print("\n📄 Testing CSV Upload...")
+        
+        # Duplicated "notes" header, no email/duration columns, and a row shorter than the header
+        csv_data = "Name,Phone,Notes,Notes,Appointment Type\nCSV Patient,555-0789,n1,n2\n"
+        with self.app.test_client() as client:
+            with client.session_transaction() as sess:
+                sess['_user_id'] = self.test_user_id
+                sess['_fresh'] = True
+            response = client.post(
+                "/upload_csv",
+                data={"patient_csv": (io.BytesIO(csv_data.encode("utf-8")), "patients.csv")},
+                content_type="multipart/form-data"
+            )
+        assert response.status_code == 302
+        
+        db.session.expire_all()
+        patients = self.patient_repo.get_waitlist(self.test_user_id)
+        csv_patient = next((p for p in patients if p['name'] == "CSV Patient"), None)
+        assert csv_patient is not None
+        self.test_data_ids['patients'].append(csv_patient['id'])
+        assert csv_patient['phone'] == "555-0789"
+        assert not csv_patient['email']
+        assert csv_patient['appointment_type'] == "custom"
+        assert int(csv_patient['duration']) == 30
+        print("✅ CSV upload column mapping successful")
+        
     def test_error_handling(self):
         """Test database error handling"""
         print("\n⚠️ Testing Error Handling...")